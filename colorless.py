@@ -1,16 +1,26 @@
 #!/usr/bin/env python
 
 import argparse
+import atexit
 import collections
+import ctypes
+import ctypes.util
 import curses
+import functools
 import locale
-import itertools
 import os
 import re
+import select
 import signal
+import stat
 import sys
 import time
 
+try:
+    from re import _parser as sre_parse
+except ImportError: # python < 3.11
+    import sre_parse
+
 
 class ExitSuccess(Exception):
     def __init__(self):
@@ -42,16 +52,28 @@ class SearchHistoryFile:
             return []
         with search_history_file:
             search_history_file.seek(0)
-            return [line.rstrip() for line in search_history_file.readlines()]
+            return list(dict.fromkeys(line.rstrip() for line in search_history_file))[:SearchHistory.MAX_SEARCH_QUERIES]
 
     @staticmethod
     def write_search_queries(search_queries):
+        # write a temporary file and rename it over the old one so a crash never leaves a truncated history
+        filepath = os.path.realpath(SearchHistoryFile._get_filepath()) # a symlinked history file keeps its link
+        temp_filepath = '{}.{}.tmp'.format(filepath, os.getpid())
+        try:
+            file_mode = stat.S_IMODE(os.stat(filepath).st_mode)
+        except EnvironmentError: # no history file yet, so the umask decides its mode
+            file_mode = None
         try:
-            search_history_file = open(SearchHistoryFile._get_filepath(), 'w')
+            with open(temp_filepath, 'w') as search_history_file:
+                if file_mode is not None:
+                    os.chmod(temp_filepath, file_mode) # before anything is written, so a private history stays private
+                search_history_file.write(''.join(search_query + '\n' for search_query in search_queries))
+            os.replace(temp_filepath, filepath)
         except EnvironmentError:
-            return
-        with search_history_file:
-            search_history_file.writelines(search_query + '\n' for search_query in search_queries)
+            try:
+                os.unlink(temp_filepath)
+            except EnvironmentError:
+                pass
 
     @staticmethod
     def _get_filepath():
@@ -63,50 +85,82 @@ class RegexCompiler:
 
     @staticmethod
     def compile_regex(regex, flags=0):
-        compiled_regex = re.compile(r'({0})'.format(regex), flags)
-        compiled_regex.split('') # empty patterns raise an exception
-        return compiled_regex
+        return re.compile(regex, flags)
 
     @staticmethod
-    def compile_smartcase_regex(regex):
+    @functools.lru_cache(maxsize=256)
+    def compile_smartcase_regex(regex, flags=0):
         if regex.islower():
-            return RegexCompiler.compile_regex(regex, re.IGNORECASE)
-        return RegexCompiler.compile_regex(regex)
+            return RegexCompiler.compile_regex(regex, flags | re.IGNORECASE)
+        return RegexCompiler.compile_regex(regex, flags)
+
+
+class FileAccessAdvisor:
+    @staticmethod
+    def advise_sequential(input_file):
+        if hasattr(os, 'posix_fadvise'):
+            FileAccessAdvisor._advise(input_file, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+    @staticmethod
+    def advise_will_need(input_file, byte_offset, length):
+        if hasattr(os, 'posix_fadvise'):
+            FileAccessAdvisor._advise(input_file, byte_offset, length, os.POSIX_FADV_WILLNEED)
+
+    @staticmethod
+    def _advise(input_file, byte_offset, length, advice):
+        try:
+            os.posix_fadvise(input_file.fileno(), byte_offset, length, advice)
+        except EnvironmentError: # e.g. pipes do not support advice
+            pass
 
 
 class LineDecoder:
-    def __init__(self, encoding, strip_chars_regex):
+    CONTROL_CHARS_REGEX = re.compile(r'\x1B\[[0-?]*[ -/]*[@-~]')
+
+    def __init__(self, encoding, strip_raw_control_chars):
         self.encoding = encoding
-        self.strip_chars_regex = strip_chars_regex
+        self.strip_raw_control_chars = strip_raw_control_chars
 
     def decode(self, line):
         try:
             sanitized_line = line.decode(self.encoding).replace('\x01', '\\x01').replace('\t', '    ')
-            return self.strip_chars_regex.sub('', sanitized_line)
         except Exception as e:
             raise ExitFailure(os.EX_DATAERR, 'Decoding line with encoding {} failed with error: "{}"'.format(self.encoding, e))
+        if self.strip_raw_control_chars and '\x1B' in sanitized_line:
+            return LineDecoder.CONTROL_CHARS_REGEX.sub('', sanitized_line)
+        return sanitized_line
 
 
 class SearchHistory:
+    MAX_SEARCH_QUERIES = 100
+    MAX_UNSAVED_SEARCH_QUERIES = 10
+
     def __init__(self, search_queries):
-        self.last_search_query = None
-        self.search_queries = search_queries
+        self.last_search_query_regex = None
+        self.search_queries = collections.OrderedDict((search_query, None) for search_query in search_queries)
+        self.unsaved_search_query_count = 0
+        atexit.register(self.save_search_queries)
 
-    def get_last_search_query(self):
-        return self.last_search_query
+    def get_last_search_query_regex(self):
+        return self.last_search_query_regex
 
     def get_search_queries(self):
-        return self.search_queries
+        return list(self.search_queries)
 
-    def insert_search_query(self, search_query):
-        self.last_search_query = search_query
-        self.search_queries.insert(0, search_query)
-        self.search_queries = SearchHistory._filter_duplicate_search_queries(self.search_queries)
+    def insert_search_query(self, search_query, compiled_search_query_regex):
+        self.last_search_query_regex = compiled_search_query_regex
+        self.search_queries[search_query] = None
+        self.search_queries.move_to_end(search_query, last=False)
+        while len(self.search_queries) > SearchHistory.MAX_SEARCH_QUERIES:
+            self.search_queries.popitem(last=True)
+        self.unsaved_search_query_count += 1
+        if self.unsaved_search_query_count >= SearchHistory.MAX_UNSAVED_SEARCH_QUERIES:
+            self.save_search_queries()
 
-    @staticmethod
-    def _filter_duplicate_search_queries(search_queries):
-        MAX_SEARCH_QUERIES = 100
-        return list(collections.OrderedDict.fromkeys(search_queries))[:MAX_SEARCH_QUERIES]
+    def save_search_queries(self):
+        if self.unsaved_search_query_count:
+            SearchHistoryFile.write_search_queries(self.get_search_queries())
+            self.unsaved_search_query_count = 0
 
 
 class FileBookmark:
@@ -124,11 +178,12 @@ class FileIterator:
         self.decoded_line_col = 0
         self.line_decoder = line_decoder
         self.term_dims = term_dims
+        self.last_page_key = None
+        self.last_page_bookmark = None
 
     def peek_next_decoded_lines(self, count):
         bookmark = self.get_bookmark()
-        first_decoded_line = self.line_decoder.decode(self.input_file.readline())[self.decoded_line_col:]
-        decoded_lines = [first_decoded_line] + [self.line_decoder.decode(self.input_file.readline()) for _ in range(count)]
+        decoded_lines = [self.line_decoder.decode(self.input_file.readline()) for _ in range(count + 1)]
         self.go_to_bookmark(bookmark)
         return decoded_lines
 
@@ -145,51 +200,66 @@ class FileIterator:
 
     def go_to_end_of_file(self):
         self.decoded_line_col = 0
-        self.input_file.seek(0, os.SEEK_END)
+        self.input_file.seek(self.get_file_size_in_bytes()) # an absolute seek keeps the read buffer, SEEK_END discards it
 
     def go_to_last_page(self):
-        self.go_to_end_of_file()
-        self.seek_prev_wrapped_lines(self.term_dims.rows)
+        self.go_to_bookmark(self._get_last_page_bookmark())
 
     def seek_to_percentage_of_file(self, percentage):
         assert 0.0 <= percentage <= 1.0
-        bookmark = self.get_bookmark()
-        self.go_to_end_of_file()
-        file_size_in_bytes = self.input_file.tell()
-        self.input_file.seek(int(percentage * file_size_in_bytes))
+        self.decoded_line_col = 0
+        self.input_file.seek(int(percentage * self.get_file_size_in_bytes()))
         next(self.prev_line_iterator())
         if self.is_past_last_page():
             self.go_to_last_page()
 
+    def get_file_size_in_bytes(self):
+        try:
+            return os.fstat(self.input_file.fileno()).st_size
+        except (AttributeError, EnvironmentError): # not backed by a file descriptor
+            byte_offset = self.input_file.tell()
+            file_size_in_bytes = self.input_file.seek(0, os.SEEK_END)
+            self.input_file.seek(byte_offset)
+            return file_size_in_bytes
+
     def is_past_last_page(self):
-        bookmark = self.get_bookmark()
-        self.go_to_last_page()
-        last_page_bookmark = self.get_bookmark()
-        self.go_to_bookmark(bookmark)
-        return bookmark > last_page_bookmark
+        return self.get_bookmark() > self._get_last_page_bookmark()
+
+    def _get_last_page_bookmark(self):
+        last_page_key = (self.get_file_size_in_bytes(), self.term_dims.rows, self.term_dims.cols)
+        if last_page_key != self.last_page_key:
+            bookmark = self.get_bookmark()
+            self.go_to_end_of_file()
+            self.seek_prev_wrapped_lines(self.term_dims.rows)
+            self.last_page_bookmark = self.get_bookmark()
+            self.last_page_key = last_page_key
+            self.go_to_bookmark(bookmark)
+        return self.last_page_bookmark
 
     def prev_line_iterator(self):
-        if self.input_file.tell() == 0:
+        line_end = self.input_file.tell()
+        if line_end == 0:
             yield ''
             return
-        CHUNK_SIZE = 2048
+        CHUNK_SIZE = 8192
+        seek, read = self.input_file.seek, self.input_file.read
+        chunk = b''
+        chunk_offset = line_end
         while True:
-            lines = []
-            chunk_size = min(CHUNK_SIZE, self.input_file.tell())
-            self.input_file.seek(-chunk_size, os.SEEK_CUR)
-            chunk = self.input_file.read(chunk_size)
-            lines = chunk.splitlines(True)
-            for line in reversed(lines[1:]):
-                self.input_file.seek(-len(line), os.SEEK_CUR)
-                yield line
-            first_line_in_chunk = lines[0]
-            if self.input_file.tell() == len(first_line_in_chunk):
-                self.input_file.seek(-len(first_line_in_chunk), os.SEEK_CUR)
-                yield first_line_in_chunk
+            newline_index = chunk.rfind(b'\n', 0, max(0, line_end - chunk_offset - 1))
+            if newline_index == -1 and chunk_offset > 0:
+                read_size = min(max(CHUNK_SIZE, len(chunk)), chunk_offset)
+                chunk_offset -= read_size
+                seek(chunk_offset)
+                chunk = read(read_size) + chunk[:line_end - chunk_offset - read_size]
+                continue
+            line_start = chunk_offset + newline_index + 1
+            seek(line_start)
+            yield chunk[line_start - chunk_offset:line_end - chunk_offset]
+            if line_start == 0:
                 yield ''
                 return
-            elif len(lines) == 1:
-                CHUNK_SIZE *= 2
+            line_end = line_start
 
     def next_line_iterator(self):
         while True:
@@ -199,35 +269,63 @@ class FileIterator:
                 return
             yield line
 
-    def seek_prev_wrapped_lines(self, count):
-        for _ in range(count):
-            self._seek_prev_wrapped_line()
+    def read_next_lines_block(self, size):
+        block = self.input_file.read(size) + self.input_file.readline()
+        FileAccessAdvisor.advise_will_need(self.input_file, self.input_file.tell(), size)
+        return block
+
+    def read_prev_lines_block(self, size):
+        block_end = self.input_file.tell()
+        while True:
+            block_start = max(0, block_end - size)
+            self.input_file.seek(block_start)
+            block = self.input_file.read(block_end - block_start)
+            first_newline_index = block.find(b'\n')
+            if block_start == 0:
+                self.input_file.seek(0)
+                return block
+            elif 0 <= first_newline_index < len(block) - 1:
+                self.input_file.seek(block_start + first_newline_index + 1)
+                return block[first_newline_index + 1:]
+            size *= 2
 
-    def _seek_prev_wrapped_line(self):
+    def seek_prev_wrapped_lines(self, count):
+        cols = self.term_dims.cols
         if self.decoded_line_col > 0:
-            self.decoded_line_col = max(0, self.decoded_line_col - self.term_dims.cols)
-            return
-        line = next(self.prev_line_iterator())
-        if not line:
+            wrapped_lines_above = -(-self.decoded_line_col // cols)
+            if count < wrapped_lines_above:
+                self.decoded_line_col -= count * cols
+                return
+            count -= wrapped_lines_above
+            self.decoded_line_col = 0
+        if count == 0:
             return
-        decoded_line = self.line_decoder.decode(line)
-        self.decoded_line_col = max(0, self.term_dims.cols * int((len(decoded_line) - 1) / self.term_dims.cols))
+        for line in self.prev_line_iterator():
+            if not line:
+                return
+            wrapped_line_count = max(1, -(-len(self.line_decoder.decode(line)) // cols))
+            if count <= wrapped_line_count:
+                self.decoded_line_col = (wrapped_line_count - count) * cols
+                return
+            count -= wrapped_line_count
 
     def seek_next_wrapped_lines(self, count):
-        for _ in range(count):
-            self._seek_next_wrapped_line()
+        cols = self.term_dims.cols
+        while count > 0:
+            line = self.input_file.readline()
+            if not line:
+                break
+            decoded_line_length = len(self.line_decoder.decode(line))
+            wrapped_lines_remaining = max(1, -(-(decoded_line_length - self.decoded_line_col) // cols))
+            if count < wrapped_lines_remaining:
+                self.decoded_line_col += count * cols
+                self.input_file.seek(-len(line), os.SEEK_CUR)
+                break
+            count -= wrapped_lines_remaining
+            self.decoded_line_col = 0
         if self.is_past_last_page():
             self.go_to_last_page()
 
-    def _seek_next_wrapped_line(self):
-        line = self.input_file.readline()
-        decoded_line = self.line_decoder.decode(line)
-        self.decoded_line_col += self.term_dims.cols
-        if self.decoded_line_col >= len(decoded_line):
-            self.decoded_line_col = 0
-        else:
-            self.input_file.seek(-len(line), os.SEEK_CUR)
-
 
 class ConfigFileReader:
     def __init__(self, config_filepath):
@@ -243,7 +341,7 @@ class ConfigFileReader:
         config = {}
         with config_file:
             try:
-                exec(config_file.read(), config)
+                exec(compile(config_file.read(), self.config_filepath, 'exec'), config)
             except Exception as e:
                 raise ExitFailure(os.EX_NOINPUT, '{}: Load failed with error "{}"'.format(self.config_filepath, e))
         REGEX_TO_COLOR = 'regex_to_color'
@@ -252,7 +350,7 @@ class ConfigFileReader:
             raise ExitFailure(os.EX_NOINPUT, err_msg)
         regex_to_color = config[REGEX_TO_COLOR]
         ConfigFileReader._validate_regex_to_color(self.config_filepath, regex_to_color)
-        regex_to_color_id = collections.OrderedDict()
+        regex_to_color_id = {}
         STARTING_COLOR_ID = 1
         for color_id, (regex, color) in enumerate(regex_to_color.items(), STARTING_COLOR_ID):
             try:
@@ -279,52 +377,245 @@ class ConfigFileReader:
 
 class LineColorMaskCalculator:
     NO_COLOR_ID = 0
+    MAX_CACHED_LINES_LENGTH = 2 * 1024 * 1024 # a few screens of long lines, bounds the cached lines and masks in bytes
+    MAX_CACHED_LINE_LENGTH = 16 * 1024
 
     def __init__(self, regex_to_color_id, search_history):
-        self.regex_to_color_id = regex_to_color_id
+        self.combined_regex, self.group_name_to_color_byte = LineColorMaskCalculator._combine_regexes(regex_to_color_id)
+        self.uncombined_regexes = []
+        if regex_to_color_id and not self.combined_regex:
+            self.uncombined_regexes = [(compiled_regex, bytes([color_id])) for compiled_regex, color_id in regex_to_color_id.items()]
         self.search_history = search_history
         self.SEARCH_COLOR_ID = 255
+        self.search_color_byte = bytes([self.SEARCH_COLOR_ID])
         curses.init_pair(self.SEARCH_COLOR_ID, curses.COLOR_BLACK, curses.COLOR_YELLOW)
+        self.cached_color_masks = collections.OrderedDict()
+        self.cached_lines_length = 0
+        self.long_line_key = None
+        self.long_line_color_mask = None
 
     def calculate_color_mask(self, line):
-        color_mask = [LineColorMaskCalculator.NO_COLOR_ID] * len(line)
-        for compiled_regex, color in self._regex_to_color_id_including_last_search_query():
-            tokens = compiled_regex.split(line)
-            col = 0
-            for index, token in enumerate(tokens):
-                token_matches_regex = (index % 2 == 1)
-                if token_matches_regex:
-                    color_mask[col:col + len(token)] = [color] * len(token)
-                col += len(token)
+        last_search_query_regex = self.search_history.get_last_search_query_regex()
+        if not self.combined_regex and not self.uncombined_regexes and not last_search_query_regex:
+            return None
+        if len(line) <= LineColorMaskCalculator.MAX_CACHED_LINE_LENGTH:
+            return self._cached_calculate_color_mask(line, last_search_query_regex)
+        # only the most recent long line is kept, which is enough to scroll through it without recoloring it
+        long_line_key = (line, last_search_query_regex)
+        if long_line_key != self.long_line_key:
+            self.long_line_key = long_line_key
+            self.long_line_color_mask = self._calculate_color_mask(line, last_search_query_regex)
+        return self.long_line_color_mask
+
+    def get_last_search_query_regex(self):
+        return self.search_history.get_last_search_query_regex()
+
+    def _cached_calculate_color_mask(self, line, last_search_query_regex):
+        key = (line, last_search_query_regex)
+        try:
+            self.cached_color_masks.move_to_end(key)
+            return self.cached_color_masks[key]
+        except KeyError:
+            pass
+        color_mask = self._calculate_color_mask(line, last_search_query_regex)
+        self.cached_color_masks[key] = color_mask
+        self.cached_lines_length += len(line)
+        while self.cached_lines_length > LineColorMaskCalculator.MAX_CACHED_LINES_LENGTH:
+            (evicted_line, _), _ = self.cached_color_masks.popitem(last=False)
+            self.cached_lines_length -= len(evicted_line)
         return color_mask
 
-    def _regex_to_color_id_including_last_search_query(self):
-        regex_to_color_id = collections.OrderedDict(self.regex_to_color_id.items())
-        last_search_query = self.search_history.get_last_search_query()
-        if last_search_query:
-            regex_to_color_id[RegexCompiler.compile_smartcase_regex(last_search_query)] = self.SEARCH_COLOR_ID
-        return regex_to_color_id.items()
+    def _calculate_color_mask(self, line, last_search_query_regex):
+        color_mask = None # most lines match nothing, so the mask is only allocated on the first match
+        if self.combined_regex:
+            group_name_to_color_byte = self.group_name_to_color_byte
+            for match in self.combined_regex.finditer(line):
+                if color_mask is None:
+                    color_mask = bytearray(len(line))
+                start, end = match.span()
+                color_mask[start:end] = group_name_to_color_byte[match.lastgroup] * (end - start)
+        for compiled_regex, color_byte in self.uncombined_regexes: # in config order, so later regexes win overlaps
+            for match in compiled_regex.finditer(line):
+                if color_mask is None:
+                    color_mask = bytearray(len(line))
+                start, end = match.span()
+                color_mask[start:end] = color_byte * (end - start)
+        if last_search_query_regex:
+            search_color_byte = self.search_color_byte
+            for match in last_search_query_regex.finditer(line):
+                if color_mask is None:
+                    color_mask = bytearray(len(line))
+                start, end = match.span()
+                color_mask[start:end] = search_color_byte * (end - start)
+        if color_mask is None:
+            return None
+        return bytes(color_mask) # cached masks are shared between redraws so they must be immutable
+
+    @staticmethod
+    def _combine_regexes(regex_to_color_id):
+        if not regex_to_color_id:
+            return None, {}
+        group_name_to_color_byte = {'color{}'.format(color_id): bytes([color_id]) for color_id in regex_to_color_id.values()}
+        combined_regex = '|'.join('(?P<color{}>{})'.format(color_id, compiled_regex.pattern)
+                                  for compiled_regex, color_id in regex_to_color_id.items())
+        try:
+            return re.compile(combined_regex), group_name_to_color_byte
+        except RegexCompiler.EXCEPTION_TYPES: # e.g. two regexes define the same group name, so each is matched on its own
+            return None, {}
+
+
+class FileModificationWaiter:
+    IN_MODIFY = 0x00000002
+    POLL_INTERVAL_SECONDS = 0.050
+    MAX_WAIT_SECONDS = 0.250 # bounds how long a terminal resize goes unnoticed
+
+    def __init__(self, filepath):
+        self.inotify_fd = FileModificationWaiter._watch(filepath)
+
+    def wait(self):
+        if self.inotify_fd is None:
+            time.sleep(FileModificationWaiter.POLL_INTERVAL_SECONDS)
+            return
+        readable_fds, _, _ = select.select([self.inotify_fd], [], [], FileModificationWaiter.MAX_WAIT_SECONDS)
+        if readable_fds:
+            self._drain_events()
+
+    def close(self):
+        if self.inotify_fd is not None:
+            os.close(self.inotify_fd)
+            self.inotify_fd = None
+
+    def _drain_events(self):
+        try:
+            while os.read(self.inotify_fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    @staticmethod
+    def _watch(filepath):
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+            inotify_fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (EnvironmentError, AttributeError, TypeError): # no inotify on this platform
+            return None
+        if inotify_fd < 0:
+            return None
+        if libc.inotify_add_watch(inotify_fd, os.fsencode(filepath), FileModificationWaiter.IN_MODIFY) < 0:
+            os.close(inotify_fd)
+            return None
+        return inotify_fd
 
 
 class TailMode:
-    def __init__(self, file_iter, screen_input_output):
+    def __init__(self, file_iter, screen_input_output, filepath):
         self.file_iter = file_iter
         self.screen_input_output = screen_input_output
+        self.filepath = filepath
 
     def start_tailing(self):
+        file_modification_waiter = FileModificationWaiter(self.filepath)
         try:
             while True:
                 self.file_iter.go_to_last_page()
                 self.screen_input_output.redraw_screen('Waiting for data... (interrupt to abort)')
-                FIFTY_MILLIS = 0.050
-                time.sleep(FIFTY_MILLIS)
+                file_modification_waiter.wait()
         except KeyboardInterrupt:
             self.file_iter.go_to_last_page()
+        finally:
+            file_modification_waiter.close()
+
+
+class CompiledSearchQuery:
+    NON_LITERAL_CHARS = frozenset('.^$*+?()[]{}|\\ \t') # spaces can come from tab expansion when decoding
+    NEWLINE = ord('\n')
+    NEWLINE_CATEGORIES = frozenset([sre_parse.CATEGORY_SPACE, sre_parse.CATEGORY_NOT_DIGIT, sre_parse.CATEGORY_NOT_WORD])
+    REPEAT_OPS = frozenset([sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, getattr(sre_parse, 'POSSESSIVE_REPEAT', None)])
+    ATOMIC_GROUP_OP = getattr(sre_parse, 'ATOMIC_GROUP', None)
+    STRING_ANCHORS = frozenset([sre_parse.AT_BEGINNING_STRING, sre_parse.AT_END_STRING])
+
+    def __init__(self, search_query, strip_raw_control_chars):
+        self.regex = RegexCompiler.compile_smartcase_regex(search_query)
+        self.multiline_regex = None
+        if CompiledSearchQuery._is_line_local(sre_parse.parse(search_query)):
+            self.multiline_regex = RegexCompiler.compile_smartcase_regex(search_query, re.MULTILINE)
+        self.ignore_case = search_query.islower()
+        self.literal = None
+        is_literal = search_query.isascii() and not CompiledSearchQuery.NON_LITERAL_CHARS.intersection(search_query)
+        if is_literal and not strip_raw_control_chars: # stripping control chars can join text across them
+            self.literal = search_query.encode('ascii')
+
+    @staticmethod
+    def _is_line_local(parsed_search_query):
+        # a multiline block search finds every line that line by line matching finds unless the query changes flags,
+        # anchors to the ends of the string, has an assertion that could look past a newline it matched or can match
+        # the empty string after a line's trailing newline
+        if parsed_search_query.state.flags & (re.DOTALL | re.MULTILINE) or parsed_search_query.getwidth()[0] == 0:
+            return False
+        can_match_newline = has_assertion = False
+        for op, av in CompiledSearchQuery._walk(parsed_search_query):
+            if op is None or (op == sre_parse.SUBPATTERN and (av[1] or av[2])):
+                return False
+            elif op == sre_parse.AT and av in CompiledSearchQuery.STRING_ANCHORS:
+                return False
+            elif op in (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+                has_assertion = True
+            elif op in (sre_parse.LITERAL, sre_parse.NOT_LITERAL, sre_parse.IN):
+                can_match_newline = can_match_newline or CompiledSearchQuery._can_match_newline(op, av)
+        return not (can_match_newline and has_assertion)
+
+    @staticmethod
+    def _walk(subpattern):
+        # yields every node of a parsed regex, and op None for any node it does not know
+        for op, av in subpattern:
+            if op in CompiledSearchQuery.REPEAT_OPS:
+                children = [av[2]]
+            elif op == sre_parse.SUBPATTERN:
+                children = [av[3]]
+            elif op == sre_parse.BRANCH:
+                children = av[1]
+            elif op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+                children = [av[1]]
+            elif op == CompiledSearchQuery.ATOMIC_GROUP_OP:
+                children = [av]
+            elif op == sre_parse.GROUPREF_EXISTS:
+                children = [child for child in av[1:] if child]
+            elif op in (sre_parse.LITERAL, sre_parse.NOT_LITERAL, sre_parse.IN, sre_parse.ANY, sre_parse.AT, sre_parse.GROUPREF):
+                children = []
+            else:
+                op, children = None, []
+            yield op, av
+            for child in children:
+                yield from CompiledSearchQuery._walk(child)
+
+    @staticmethod
+    def _can_match_newline(op, av):
+        if op == sre_parse.LITERAL:
+            return av == CompiledSearchQuery.NEWLINE
+        elif op == sre_parse.NOT_LITERAL:
+            return av != CompiledSearchQuery.NEWLINE
+        negated = bool(av) and av[0][0] == sre_parse.NEGATE
+        for item_op, item_av in av:
+            if ((item_op == sre_parse.LITERAL and item_av == CompiledSearchQuery.NEWLINE) or
+                    (item_op == sre_parse.RANGE and item_av[0] <= CompiledSearchQuery.NEWLINE <= item_av[1]) or
+                    (item_op == sre_parse.CATEGORY and item_av in CompiledSearchQuery.NEWLINE_CATEGORIES)):
+                return not negated
+        return negated
+
+    def may_match_lines_block(self, block):
+        if self.literal is None or b'\x01' in block: # decoding expands the \x01 byte into the text \\x01
+            return True
+        if self.ignore_case:
+            # non-ascii text can case fold to ascii (e.g. the kelvin sign matches k)
+            return not block.isascii() or self.literal in block.lower()
+        return self.literal in block
 
 
 class SearchMode:
     SEARCH_FORWARDS_CHAR = '/'
     SEARCH_BACKWARDS_CHAR = '?'
+    MIN_BLOCK_SIZE = 4 * 1024 # the next match is usually close, so blocks start small and double up to the max
+    MAX_BLOCK_SIZE = 1024 * 1024
 
     def __init__(self, file_iter, line_decoder, screen_input_output, search_history):
         self.file_iter = file_iter
@@ -343,19 +634,18 @@ class SearchMode:
         if not search_query:
             return
         try:
-            compiled_search_query_regex = RegexCompiler.compile_smartcase_regex(search_query)
+            compiled_search_query = CompiledSearchQuery(search_query, self.line_decoder.strip_raw_control_chars)
         except RegexCompiler.EXCEPTION_TYPES as e:
             self.screen_input_output.redraw_screen('Compiling regex {} failed with error: "{}" - press any key to continue'.format(search_query, e))
             self.screen_input_output.get_user_input()
             return
-        self.search_history.insert_search_query(search_query)
-        SearchHistoryFile.write_search_queries(self.search_history.get_search_queries())
+        self.search_history.insert_search_query(search_query, compiled_search_query.regex)
+        search_forwards = lambda: self._search_forwards(compiled_search_query)
+        search_backwards = lambda: self._search_backwards(compiled_search_query)
         if search_direction_char == SearchMode.SEARCH_FORWARDS_CHAR:
-            self._continue_search = lambda: self._search_forwards(compiled_search_query_regex)
-            self._continue_reverse_search = lambda: self._search_backwards(compiled_search_query_regex)
+            self._continue_search, self._continue_reverse_search = search_forwards, search_backwards
         elif search_direction_char == SearchMode.SEARCH_BACKWARDS_CHAR:
-            self._continue_search = lambda: self._search_backwards(compiled_search_query_regex)
-            self._continue_reverse_search = lambda: self._search_forwards(compiled_search_query_regex)
+            self._continue_search, self._continue_reverse_search = search_backwards, search_forwards
         self.continue_search()
 
     def continue_search(self):
@@ -375,23 +665,75 @@ class SearchMode:
         except KeyboardInterrupt:
             self.file_iter.go_to_bookmark(bookmark)
 
-    def _search_forwards(self, compiled_search_query_regex):
+    def _search_forwards(self, compiled_search_query):
         next(self.file_iter.next_line_iterator())
-        for line in self.file_iter.next_line_iterator():
-            if not line:
+        block_size = SearchMode.MIN_BLOCK_SIZE
+        while True:
+            block_offset = self.file_iter.get_bookmark().byte_offset
+            block = self.file_iter.read_next_lines_block(block_size)
+            if not block:
                 return False
-            elif compiled_search_query_regex.search(self.line_decoder.decode(line)):
-                next(self.file_iter.prev_line_iterator())
+            for line_index in self._matching_line_indexes(block, compiled_search_query):
+                self.file_iter.go_to_bookmark(FileBookmark(block_offset + SearchMode._byte_offset_of_line(block, line_index), 0))
                 if self.file_iter.is_past_last_page():
                     self.file_iter.go_to_last_page()
                 return True
+            block_size = min(2 * block_size, SearchMode.MAX_BLOCK_SIZE)
 
-    def _search_backwards(self, compiled_search_query_regex):
-        for line in self.file_iter.prev_line_iterator():
-            if not line:
+    def _search_backwards(self, compiled_search_query):
+        block_size = SearchMode.MIN_BLOCK_SIZE
+        while True:
+            block = self.file_iter.read_prev_lines_block(block_size)
+            if not block:
                 return False
-            elif compiled_search_query_regex.search(self.line_decoder.decode(line)):
+            block_offset = self.file_iter.get_bookmark().byte_offset
+            for line_index in self._matching_line_indexes(block, compiled_search_query, reverse=True):
+                self.file_iter.go_to_bookmark(FileBookmark(block_offset + SearchMode._byte_offset_of_line(block, line_index), 0))
                 return True
+            block_size = min(2 * block_size, SearchMode.MAX_BLOCK_SIZE)
+
+    def _matching_line_indexes(self, block, compiled_search_query, reverse=False):
+        if not compiled_search_query.may_match_lines_block(block):
+            return iter(())
+        if not compiled_search_query.multiline_regex:
+            return self._line_by_line_matching_line_indexes(block, compiled_search_query, reverse)
+        try:
+            decoded_block = self.line_decoder.decode(block)
+        except ExitFailure: # decode line by line so that an undecodable line only fails the search once it is reached
+            return self._line_by_line_matching_line_indexes(block, compiled_search_query, reverse)
+        line_indexes = self._multiline_matching_line_indexes(decoded_block, compiled_search_query)
+        return reversed(list(line_indexes)) if reverse else line_indexes
+
+    def _line_by_line_matching_line_indexes(self, block, compiled_search_query, reverse):
+        lines = block.split(b'\n')
+        lines = [line + b'\n' for line in lines[:-1]] + ([lines[-1]] if lines[-1] else [])
+        line_indexes = range(len(lines))
+        for line_index in reversed(line_indexes) if reverse else line_indexes:
+            if compiled_search_query.regex.search(self.line_decoder.decode(lines[line_index])):
+                yield line_index
+
+    def _multiline_matching_line_indexes(self, decoded_block, compiled_search_query):
+        # the multiline regex finds candidate lines across the whole block in one pass, each candidate is then
+        # confirmed against its own line so that matches spanning a newline are not reported
+        line_index = 0
+        line_start = 0
+        while line_start < len(decoded_block):
+            match = compiled_search_query.multiline_regex.search(decoded_block, line_start)
+            if not match:
+                return
+            match_line_start = decoded_block.rfind('\n', line_start, match.start()) + 1 or line_start
+            if match_line_start == len(decoded_block):
+                return
+            match_line_end = decoded_block.find('\n', match.start()) + 1 or len(decoded_block)
+            line_index += decoded_block.count('\n', line_start, match_line_start)
+            if compiled_search_query.regex.search(decoded_block[match_line_start:match_line_end]):
+                yield line_index
+            line_index += 1
+            line_start = match_line_end
+
+    @staticmethod
+    def _byte_offset_of_line(block, line_index):
+        return sum(len(line) + 1 for line in block.split(b'\n', line_index)[:line_index])
 
     def _wait_for_user_to_input_search_query(self, search_direction_char):
         search_prefix = ''
@@ -424,58 +766,84 @@ class SearchMode:
 
 
 class ScreenInputOutput:
+    COLORED_RUN_REGEX = re.compile(rb'([^\x00])\1*', re.DOTALL) # runs of the same non-zero color id
+
     def __init__(self, screen, term_dims, line_color_mask_calculator, file_iter):
         self.screen = screen
         self.term_dims = term_dims
         self.line_color_mask_calculator = line_color_mask_calculator
         self.file_iter = file_iter
+        self.pending_user_inputs = collections.deque()
+        self.last_frame = None
 
     def redraw_screen(self, prompt, cursor_position=None):
         self.term_dims.update(self.screen)
+        rows, cols = self.term_dims.rows, self.term_dims.cols
+        bookmark = self.file_iter.get_bookmark()
+        frame = (bookmark.byte_offset, bookmark.decoded_line_col, rows, cols, prompt, cursor_position,
+                 self.line_color_mask_calculator.get_last_search_query_regex(), self.file_iter.get_file_size_in_bytes())
+        if frame == self.last_frame:
+            return
+        self.last_frame = frame
+        addstr = self.screen.addstr
+        calculate_color_mask = self.line_color_mask_calculator.calculate_color_mask
         self.screen.move(0, 0)
         row = 0
         self.screen.erase()
-        for decoded_line in self.file_iter.peek_next_decoded_lines(self.term_dims.rows):
-            color_mask = self.line_color_mask_calculator.calculate_color_mask(decoded_line)
-            wrapped_decoded_lines = self._wrap(decoded_line, self.term_dims.cols)
-            wrapped_color_masks = self._wrap(color_mask, self.term_dims.cols)
-            for (wrapped_decoded_line, wrapped_color_mask) in zip(wrapped_decoded_lines, wrapped_color_masks):
-                if row == self.term_dims.rows:
+        wrap_start_col = bookmark.decoded_line_col # the top line is colored whole so its mask is cached once for every col
+        for decoded_line in self.file_iter.peek_next_decoded_lines(rows):
+            if row == rows:
+                break
+            color_mask = calculate_color_mask(decoded_line)
+            has_color = color_mask and any(color_mask)
+            if has_color:
+                color_mask = memoryview(color_mask) # wrapped slices of a view share the cached mask instead of copying it
+            for wrap_start in range(wrap_start_col, len(decoded_line), cols):
+                if row == rows:
                     break
-                self.screen.addstr(row, 0, wrapped_decoded_line)
-                self._draw_color_mask(row, wrapped_decoded_line, wrapped_color_mask)
+                wrap_end = wrap_start + cols
+                addstr(row, 0, decoded_line[wrap_start:wrap_end])
+                if has_color:
+                    self._draw_color_mask(row, color_mask[wrap_start:wrap_end])
                 row += 1
-        last_visible_col = self.term_dims.cols - 2
-        self.screen.addstr(self.term_dims.rows, 0, prompt[:last_visible_col])
+            wrap_start_col = 0
+        last_visible_col = cols - 2
+        addstr(rows, 0, prompt[:last_visible_col])
         if cursor_position:
-            self.screen.move(self.term_dims.rows, min(cursor_position, last_visible_col))
+            self.screen.move(rows, min(cursor_position, last_visible_col))
         self.screen.refresh()
 
     def get_user_input(self):
+        if self.pending_user_inputs:
+            return self.pending_user_inputs.popleft()
         return self.screen.getch()
 
-    def _wrap(self, line, cols):
-        return [line[i:i + cols] for i in range(0, len(line), cols)]
-
-    def _draw_color_mask(self, row, wrapped_decoded_line, wrapped_color_mask):
-        col = 0
-        for color, length in self._contiguous_color_ids(wrapped_color_mask):
-            if color != 0:
-                self.screen.addstr(row, col, wrapped_decoded_line[col:col + length], curses.color_pair(color))
-            col += length
+    def has_pending_user_input(self):
+        if self.pending_user_inputs:
+            return True
+        self.screen.nodelay(True)
+        try:
+            user_input = self.screen.getch()
+        finally:
+            self.screen.nodelay(False)
+        if user_input == curses.ERR:
+            return False
+        self.pending_user_inputs.append(user_input)
+        return True
 
-    def _contiguous_color_ids(self, wrapped_color_mask):
-        return [(color_id, len(list(group_iter))) for color_id, group_iter in itertools.groupby(wrapped_color_mask)]
+    def _draw_color_mask(self, row, wrapped_color_mask):
+        chgat = self.screen.chgat
+        for color_run in ScreenInputOutput.COLORED_RUN_REGEX.finditer(wrapped_color_mask):
+            start, end = color_run.span()
+            chgat(row, start, end - start, curses.color_pair(wrapped_color_mask[start]))
 
 
 def run_curses(screen, input_file, config_filepath, encoding, strip_raw_control_chars):
     curses.use_default_colors()
     VERY_VISIBLE = 2
     curses.curs_set(VERY_VISIBLE)
-    UNMATCHABLE_REGEX = re.compile('a^')
-    CONTROL_CHARS_REGEX = re.compile(r'\x1B\[[0-?]*[ -/]*[@-~]')
-    strip_chars_regex = (CONTROL_CHARS_REGEX if strip_raw_control_chars else UNMATCHABLE_REGEX)
-    line_decoder = LineDecoder(encoding, strip_chars_regex)
+    screen.idlok(True) # let refresh scroll the terminal instead of repainting every row on j/k
+    line_decoder = LineDecoder(encoding, strip_raw_control_chars)
     search_queries = SearchHistoryFile.load_search_queries()
     search_history = SearchHistory(search_queries)
     config_file_reader = ConfigFileReader(config_filepath)
@@ -485,45 +853,36 @@ def run_curses(screen, input_file, config_filepath, encoding, strip_raw_control_
     file_iter = FileIterator(input_file, line_decoder, term_dims)
     screen_input_output = ScreenInputOutput(screen, term_dims, line_color_mask_calculator, file_iter)
     search_mode = SearchMode(file_iter, line_decoder, screen_input_output, search_history)
-    tail_mode = TailMode(file_iter, screen_input_output)
+    tail_mode = TailMode(file_iter, screen_input_output, input_file.name)
+    user_input_to_action = {
+        ord('j'): lambda: file_iter.seek_next_wrapped_lines(1),
+        ord('k'): lambda: file_iter.seek_prev_wrapped_lines(1),
+        ord('d'): lambda: file_iter.seek_next_wrapped_lines(term_dims.rows // 2),
+        ord('u'): lambda: file_iter.seek_prev_wrapped_lines(term_dims.rows // 2),
+        ord('f'): lambda: file_iter.seek_next_wrapped_lines(term_dims.rows),
+        ord('b'): lambda: file_iter.seek_prev_wrapped_lines(term_dims.rows),
+        ord('g'): file_iter.go_to_start_of_file,
+        ord('G'): file_iter.go_to_last_page,
+        ord('H'): lambda: file_iter.seek_to_percentage_of_file(0.25),
+        ord('M'): lambda: file_iter.seek_to_percentage_of_file(0.50),
+        ord('L'): lambda: file_iter.seek_to_percentage_of_file(0.75),
+        ord('F'): tail_mode.start_tailing,
+        ord(SearchMode.SEARCH_FORWARDS_CHAR): lambda: search_mode.start_new_search(SearchMode.SEARCH_FORWARDS_CHAR),
+        ord(SearchMode.SEARCH_BACKWARDS_CHAR): lambda: search_mode.start_new_search(SearchMode.SEARCH_BACKWARDS_CHAR),
+        ord('n'): search_mode.continue_search,
+        ord('N'): search_mode.continue_reverse_search,
+    }
+    QUIT_USER_INPUT = ord('q')
     while True:
         try:
-            screen_input_output.redraw_screen(':')
+            if not screen_input_output.has_pending_user_input(): # skip frames while keys are held down
+                screen_input_output.redraw_screen(':')
             user_input = screen_input_output.get_user_input()
-            if user_input == ord('q'):
+            if user_input == QUIT_USER_INPUT:
                 return os.EX_OK
-            elif user_input == ord('j'):
-                file_iter.seek_next_wrapped_lines(1)
-            elif user_input == ord('k'):
-                file_iter.seek_prev_wrapped_lines(1)
-            elif user_input == ord('d'):
-                file_iter.seek_next_wrapped_lines(int(term_dims.rows / 2))
-            elif user_input == ord('u'):
-                file_iter.seek_prev_wrapped_lines(int(term_dims.rows / 2))
-            elif user_input == ord('f'):
-                file_iter.seek_next_wrapped_lines(term_dims.rows)
-            elif user_input == ord('b'):
-                file_iter.seek_prev_wrapped_lines(term_dims.rows)
-            elif user_input == ord('g'):
-                file_iter.go_to_start_of_file()
-            elif user_input == ord('G'):
-                file_iter.go_to_last_page()
-            elif user_input == ord('H'):
-                file_iter.seek_to_percentage_of_file(0.25)
-            elif user_input == ord('M'):
-                file_iter.seek_to_percentage_of_file(0.50)
-            elif user_input == ord('L'):
-                file_iter.seek_to_percentage_of_file(0.75)
-            elif user_input == ord('F'):
-                tail_mode.start_tailing()
-            elif user_input == ord(SearchMode.SEARCH_FORWARDS_CHAR):
-                search_mode.start_new_search(SearchMode.SEARCH_FORWARDS_CHAR)
-            elif user_input == ord(SearchMode.SEARCH_BACKWARDS_CHAR):
-                search_mode.start_new_search(SearchMode.SEARCH_BACKWARDS_CHAR)
-            elif user_input == ord('n'):
-                search_mode.continue_search()
-            elif user_input == ord('N'):
-                search_mode.continue_reverse_search()
+            action = user_input_to_action.get(user_input)
+            if action:
+                action()
         except KeyboardInterrupt:
             pass
 
@@ -558,11 +917,13 @@ def run(args):
         arg_parser.print_help()
         return os.EX_USAGE
     args = arg_parser.parse_args()
+    INPUT_FILE_BUFFER_SIZE = 128 * 1024
     try:
-        input_file = open(args.filepath, 'rb')
+        input_file = open(args.filepath, 'rb', buffering=INPUT_FILE_BUFFER_SIZE)
     except EnvironmentError:
         raise ExitFailure(os.EX_NOINPUT, '{}: No such file or directory'.format(args.filepath))
     with input_file:
+        FileAccessAdvisor.advise_sequential(input_file)
         return curses.wrapper(run_curses, input_file, args.config_filepath, args.encoding, args.strip_raw_control_chars)
 
 